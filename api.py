@@ -1,8 +1,14 @@
-from flask import Blueprint, jsonify, g
-from datetime import date, timedelta
+from flask import Blueprint, jsonify, g, request
+from datetime import date, datetime, timedelta
 from sqlalchemy import func
 
 from models import MenuItem, SaleLog
+from stats import (
+    COMPARISON_MODES,
+    get_comparison_periods,
+    get_hourly_heatmap,
+    get_period_comparison,
+)
 
 api = Blueprint("api", __name__)
 
@@ -208,3 +214,53 @@ def item_month_breakdown(item_id):
         "qty": [r.qty for r in rows],
         "earn": [float(r.earn) for r in rows]
     })
+
+
+# ---------------------------------------------------------
+# HEATMAP (item x weekday x hour — from hourly buckets)
+# ---------------------------------------------------------
+@api.route("/heatmap")
+def heatmap():
+    db = g.db
+    today = date.today()
+
+    start_str = request.args.get("start")
+    end_str = request.args.get("end")
+
+    try:
+        end_date = (
+            datetime.strptime(end_str, "%Y-%m-%d").date() if end_str else today
+        )
+        start_date = (
+            datetime.strptime(start_str, "%Y-%m-%d").date()
+            if start_str else end_date - timedelta(days=27)
+        )
+    except ValueError:
+        return jsonify({"error": "Dates must be in YYYY-MM-DD format."}), 400
+
+    if start_date > end_date:
+        return jsonify({"error": "start must be on or before end."}), 400
+
+    data = get_hourly_heatmap(db, start_date, end_date)
+    data["start"] = start_date.isoformat()
+    data["end"] = end_date.isoformat()
+
+    return jsonify(data)
+
+
+# ---------------------------------------------------------
+# PERIOD-OVER-PERIOD COMPARISON (single scan)
+# ---------------------------------------------------------
+@api.route("/compare")
+def compare():
+    db = g.db
+    mode = request.args.get("period", "week")
+
+    if mode not in COMPARISON_MODES:
+        return jsonify({"error": f"period must be one of: {', '.join(COMPARISON_MODES)}"}), 400
+
+    current, prior = get_comparison_periods(date.today(), mode)
+    data = get_period_comparison(db, current, prior)
+    data["period"] = mode
+
+    return jsonify(data)
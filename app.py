@@ -11,8 +11,15 @@ from flask import (
 )
 
 from api import api
-from database import Base, engine, SessionLocal
+from importer import sales_cli
+from database import Base, engine, SessionLocal, add_missing_columns
 from models import MenuItem, SaleLog
+from stats import (
+    add_to_hour_bucket,
+    bump_counters,
+    ensure_counters,
+    item_sales_totals,
+)
 
 # -----------------------------
 # APP CONFIG
@@ -21,9 +28,15 @@ app = Flask(__name__)
 app.secret_key = "development-secret"
 
 app.register_blueprint(api, url_prefix="/api")
+app.cli.add_command(sales_cli)
 
 # Create all tables
 Base.metadata.create_all(bind=engine)
+add_missing_columns()
+
+with SessionLocal() as seed_db:
+    ensure_counters(seed_db)
+    seed_db.commit()
 
 
 # -----------------------------
@@ -76,6 +89,7 @@ def index():
                 flash("Item already exists.", "error")
             else:
                 db.add(MenuItem(name=name, price=price))
+                bump_counters(db, total_items=1)
                 flash("Menu item added!", "success")
 
             return redirect(url_for("index"))
@@ -85,6 +99,7 @@ def index():
             item_id = request.form.get("item_id")
             date_str = request.form.get("date")
             qty_str = request.form.get("quantity")
+            time_str = request.form.get("time", "").strip()
 
             if not item_id or not date_str or not qty_str:
                 flash("All fields are required.", "error")
@@ -102,6 +117,14 @@ def index():
                 flash("Invalid date format.", "error")
                 return redirect(url_for("index"))
 
+            sold_at = None
+            if time_str:
+                try:
+                    sold_at = datetime.strptime(time_str, "%H:%M").time()
+                except ValueError:
+                    flash("Invalid time format.", "error")
+                    return redirect(url_for("index"))
+
             item = db.query(MenuItem).get(int(item_id))
             if not item:
                 flash("Menu item not found.", "error")
@@ -109,8 +132,16 @@ def index():
                 db.add(SaleLog(
                     item_id=item.id,
                     date=sale_date,
-                    quantity=quantity
+                    quantity=quantity,
+                    sold_at=sold_at
                 ))
+                add_to_hour_bucket(db, item.id, sale_date, sold_at, quantity)
+                bump_counters(
+                    db,
+                    total_sale_logs=1,
+                    lifetime_qty=quantity,
+                    lifetime_revenue=quantity * item.price
+                )
                 flash("Sale logged!", "success")
 
             return redirect(url_for("index"))
@@ -125,7 +156,15 @@ def index():
 # -----------------------------
 # STATS PAGE
 # -----------------------------
-from stats import get_daily_sales, get_monthly_sales, get_weekly_sales
+from stats import (
+    COMPARISON_MODES,
+    get_comparison_periods,
+    get_counters,
+    get_daily_sales,
+    get_monthly_sales,
+    get_period_comparison,
+    get_weekly_sales,
+)
 
 @app.route("/stats")
 def stats_page():
@@ -151,6 +190,29 @@ def stats_page():
 
 
 
+# -----------------------------
+# COMPARISON PAGE
+# -----------------------------
+@app.route("/compare")
+def compare_page():
+    db = g.db
+
+    mode = request.args.get("period", "week")
+    if mode not in COMPARISON_MODES:
+        mode = "week"
+
+    current, prior = get_comparison_periods(date.today(), mode)
+    comparison = get_period_comparison(db, current, prior)
+
+    return render_template(
+        "compare.html",
+        mode=mode,
+        modes=COMPARISON_MODES,
+        comparison=comparison
+    )
+
+
+
 # -----------------------------
 # ITEMS PAGE
 # -----------------------------
@@ -197,6 +259,12 @@ def edit_item(item_id):
             flash("Another item already has that name", "error")
             return redirect(url_for("edit_item", item_id=item_id))
 
+        if price != item.price:
+            # Revenue is qty x current price, so re-price this item's history.
+            # The qty is summed inside the UPDATE, in the write transaction.
+            _, item_qty = item_sales_totals(item_id)
+            bump_counters(db, lifetime_revenue=item_qty * (price - item.price))
+
         item.name = name
         item.price = price
 
@@ -219,6 +287,17 @@ def delete_item(item_id):
         flash("Item not found", "error")
         return redirect(url_for("items_page"))
 
+    # Update the counters first: the UPDATE opens the write transaction, so
+    # the sales it subtracts are exactly the ones the cascade deletes below.
+    sale_count, item_qty = item_sales_totals(item_id)
+    bump_counters(
+        db,
+        total_items=-1,
+        total_sale_logs=-sale_count,
+        lifetime_qty=-item_qty,
+        lifetime_revenue=-item_qty * item.price
+    )
+
     db.delete(item)
     flash("Item and related sales deleted", "success")
     return redirect(url_for("items_page"))
@@ -241,8 +320,7 @@ def dashboard():
     best_week = max(weekly_rows, key=lambda r: r.qty, default=None)
     best_month = max(monthly_rows, key=lambda r: r.qty, default=None)
 
-    total_items = db.query(MenuItem).count()
-    total_sales_logs = db.query(SaleLog).count()
+    counters = get_counters(db)
 
     return render_template(
         "dashboard.html",
@@ -251,7 +329,10 @@ def dashboard():
         weekly_earnings=weekly_earnings,
         monthly_earnings=monthly_earnings,
         best_today=best_today, best_week=best_week, best_month=best_month,
-        total_items=total_items, total_sales_logs=total_sales_logs,
+        total_items=counters["total_items"],
+        total_sales_logs=counters["total_sale_logs"],
+        lifetime_qty=counters["lifetime_qty"],
+        lifetime_revenue=counters["lifetime_revenue"],
     )
 
 
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 DATABASE_URL = "sqlite:///menu_tracker.db"
@@ -18,4 +18,29 @@ SessionLocal = sessionmaker(
 )
 
 #Base is the base class for all our models
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
+
+
+def add_missing_columns():
+    """Add new nullable columns to tables that already exist.
+
+    create_all() only creates missing tables, so columns added to a model
+    later (e.g. SaleLog.sold_at) have to be added to an existing DB here.
+    """
+    inspector = inspect(engine)
+    existing_tables = inspector.get_table_names()
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+
+                col_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(
+                    f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}"
+                ))
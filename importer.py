@@ -0,0 +1,397 @@
+import csv
+import json
+import mmap
+import os
+import time
+from collections import Counter
+from datetime import datetime
+
+import click
+from flask.cli import AppGroup
+
+from database import SessionLocal, engine
+from models import MenuItem, StatCounter
+from stats import reconcile_counters
+
+sales_cli = AppGroup("sales", help="Bulk sales data commands.")
+
+
+# ---------------------------------------------------------
+# SCRATCH TABLES
+# ---------------------------------------------------------
+
+STAGING_DDL = """
+CREATE TABLE IF NOT EXISTS sale_logs_staging (
+    item_id INTEGER NOT NULL,
+    date DATE NOT NULL,
+    quantity INTEGER NOT NULL,
+    sold_at TIME,
+    weekday INTEGER,
+    hour INTEGER
+)
+"""
+
+CHECKPOINT_DDL = """
+CREATE TABLE IF NOT EXISTS import_checkpoints (
+    path VARCHAR PRIMARY KEY,
+    size INTEGER NOT NULL,
+    byte_offset INTEGER NOT NULL,
+    rows_done INTEGER NOT NULL
+)
+"""
+
+# Only safe-to-crash pragmas: synchronous=OFF loses nothing if the process
+# dies (just on power loss), so the per-chunk checkpoints stay trustworthy.
+FAST_LOAD_PRAGMAS = {
+    "synchronous": "OFF",
+    "temp_store": "MEMORY",
+    "cache_size": "-200000",
+}
+
+
+# ---------------------------------------------------------
+# PARSING
+# ---------------------------------------------------------
+
+def iter_chunks(mm, start, chunk_size):
+    """Yield (lines, bad_lines, end_offset) chunks from a memory map.
+
+    Lines that are not valid UTF-8 are counted in bad_lines instead of
+    aborting the import (and every resume of it) on one bad byte.
+    """
+    mm.seek(start)
+    while True:
+        lines = []
+        bad_lines = 0
+        while len(lines) + bad_lines < chunk_size:
+            line = mm.readline()
+            if not line:
+                break
+            if not line.strip():
+                continue
+            try:
+                lines.append(line.decode("utf-8").rstrip("\r\n"))
+            except UnicodeDecodeError:
+                bad_lines += 1
+
+        if not lines and not bad_lines:
+            return
+        yield lines, bad_lines, mm.tell()
+
+
+def parse_csv_lines(lines, columns):
+    for values in csv.reader(lines):
+        yield dict(zip(columns, values))
+
+
+def parse_ndjson_lines(lines):
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield record if isinstance(record, dict) else {}
+
+
+def parse_quantity(value):
+    """Return value as an int, or None unless it is an integer or a string of one.
+
+    Mirrors int(qty_str) in the log_sale form: floats (2.9) and booleans are
+    rejected rather than silently truncated.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            return None
+    return None
+
+
+def to_staging_row(record, item_id):
+    """Convert one parsed record into a staging tuple, or None if malformed."""
+    try:
+        sale_date = datetime.strptime(str(record["date"]).strip(), "%Y-%m-%d").date()
+        quantity = parse_quantity(record["quantity"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    if quantity is None:
+        return None
+
+    sold_at = None
+    time_str = str(record.get("time") or "").strip()
+    if time_str:
+        fmt = "%H:%M:%S" if time_str.count(":") == 2 else "%H:%M"
+        try:
+            sold_at = datetime.strptime(time_str, fmt).time()
+        except ValueError:
+            return None
+
+    return (
+        item_id,
+        sale_date.isoformat(),
+        quantity,
+        sold_at.strftime("%H:%M:%S.%f") if sold_at else None,
+        sale_date.weekday() if sold_at else None,
+        sold_at.hour if sold_at else None,
+    )
+
+
+# ---------------------------------------------------------
+# MERGE
+# ---------------------------------------------------------
+
+def merge_staging(conn):
+    """Move staged rows into sale_logs and the hourly buckets."""
+    conn.exec_driver_sql(
+        "INSERT INTO sale_logs (item_id, date, quantity, sold_at) "
+        "SELECT item_id, date, quantity, sold_at FROM sale_logs_staging"
+    )
+    conn.exec_driver_sql(
+        "INSERT INTO sale_hour_buckets (item_id, date, weekday, hour, quantity) "
+        "SELECT item_id, date, weekday, hour, SUM(quantity) "
+        "FROM sale_logs_staging WHERE hour IS NOT NULL "
+        "GROUP BY item_id, date, weekday, hour "
+        "ON CONFLICT (item_id, date, hour) "
+        "DO UPDATE SET quantity = sale_hour_buckets.quantity + excluded.quantity"
+    )
+    bump_counters_from_staging(conn)
+    conn.exec_driver_sql("DELETE FROM sale_logs_staging")
+
+
+def bump_counters_from_staging(conn):
+    """Add the staged chunk's totals to the running dashboard counters."""
+    count, qty, revenue = conn.exec_driver_sql(
+        "SELECT COUNT(*), COALESCE(SUM(s.quantity), 0), "
+        "COALESCE(SUM(s.quantity * m.price), 0) "
+        "FROM sale_logs_staging s JOIN menu_items m ON m.id = s.item_id"
+    ).first()
+
+    for name, delta in (
+        ("total_sale_logs", count),
+        ("lifetime_qty", qty),
+        ("lifetime_revenue", revenue),
+    ):
+        conn.exec_driver_sql(
+            "UPDATE stat_counters SET value = value + ? WHERE name = ?",
+            (delta, name),
+        )
+
+
+def save_checkpoint(conn, path, size, offset, rows_done):
+    conn.exec_driver_sql(
+        "INSERT INTO import_checkpoints (path, size, byte_offset, rows_done) "
+        "VALUES (?, ?, ?, ?) "
+        "ON CONFLICT (path) DO UPDATE SET size = excluded.size, "
+        "byte_offset = excluded.byte_offset, rows_done = excluded.rows_done",
+        (path, size, offset, rows_done),
+    )
+
+
+# ---------------------------------------------------------
+# CLI
+# ---------------------------------------------------------
+
+@sales_cli.command("import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--chunk-size", default=50000, show_default=True,
+              help="Rows merged per transaction.")
+@click.option("--restart", is_flag=True,
+              help="Ignore any saved checkpoint and start from the top. Rows "
+                   "already merged by the earlier run are NOT removed and will "
+                   "be imported again; requires --allow-duplicates if a "
+                   "checkpoint exists.")
+@click.option("--allow-duplicates", is_flag=True,
+              help="Confirm that re-importing rows already merged by an "
+                   "earlier partial or completed run (duplicating them) is "
+                   "intended.")
+def import_sales(path, chunk_size, restart, allow_duplicates):
+    """Load historical sales from a CSV or NDJSON file.
+
+    CSV needs an item,date,quantity header (time optional); NDJSON lines use
+    the same keys. Item names must match existing menu items.
+    """
+    path = os.path.abspath(path)
+    size = os.path.getsize(path)
+    is_csv = path.lower().endswith(".csv")
+
+    if size == 0:
+        click.echo("File is empty, nothing to import.")
+        return
+
+    with engine.connect() as conn:
+        conn.exec_driver_sql(STAGING_DDL)
+        conn.exec_driver_sql(CHECKPOINT_DDL)
+        conn.exec_driver_sql("DELETE FROM sale_logs_staging")
+        conn.commit()
+
+        # Resolve item names once, up front
+        item_ids = {
+            name: item_id
+            for item_id, name in conn.exec_driver_sql(
+                f"SELECT id, name FROM {MenuItem.__tablename__}"
+            )
+        }
+
+        checkpoint = conn.exec_driver_sql(
+            "SELECT size, byte_offset, rows_done FROM import_checkpoints "
+            "WHERE path = ?",
+            (path,),
+        ).first()
+
+        # An earlier run (partial or finished) already merged its rows;
+        # starting from the top again would duplicate them in sale_logs,
+        # buckets and counters.
+        completed = (
+            checkpoint is not None
+            and checkpoint.size == size
+            and checkpoint.byte_offset >= size
+        )
+        if checkpoint and (restart or completed or checkpoint.size != size):
+            if not allow_duplicates:
+                if completed:
+                    raise click.ClickException(
+                        f"This file was already fully imported "
+                        f"({checkpoint.rows_done:,} rows). Importing it again "
+                        "would add every row twice; pass --allow-duplicates "
+                        "if that is really intended."
+                    )
+                reason = (
+                    "--restart was given" if restart
+                    else "the file has changed size since then"
+                )
+                raise click.ClickException(
+                    f"An earlier run already merged {checkpoint.rows_done:,} rows "
+                    f"from this file, but {reason}. Starting over would import "
+                    "those rows twice. Re-run the same file without --restart "
+                    "to resume, or pass --allow-duplicates if that is really "
+                    "intended."
+                )
+            checkpoint = None
+
+        previous = {
+            name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+            for name in FAST_LOAD_PRAGMAS
+        }
+        for name, value in FAST_LOAD_PRAGMAS.items():
+            conn.exec_driver_sql(f"PRAGMA {name} = {value}")
+
+        try:
+            with open(path, "rb") as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                columns = None
+                start = 0
+                if is_csv:
+                    try:
+                        header = mm.readline().decode("utf-8-sig").rstrip("\r\n")
+                    except UnicodeDecodeError:
+                        raise click.ClickException("CSV header is not valid UTF-8.")
+                    columns = [c.strip().lower() for c in next(csv.reader([header]))]
+                    start = mm.tell()
+                    missing = {"item", "date", "quantity"} - set(columns)
+                    if missing:
+                        raise click.ClickException(
+                            f"CSV header is missing: {', '.join(sorted(missing))}"
+                        )
+
+                rows_done = 0
+                if checkpoint:
+                    start = max(start, checkpoint.byte_offset)
+                    rows_done = checkpoint.rows_done
+                    click.echo(f"Resuming after {rows_done:,} rows.")
+
+                skipped = 0
+                loaded = 0
+                unknown_items = Counter()
+                started = time.perf_counter()
+
+                for lines, bad_lines, offset in iter_chunks(mm, start, chunk_size):
+                    skipped += bad_lines
+
+                    if is_csv:
+                        records = parse_csv_lines(lines, columns)
+                    else:
+                        records = parse_ndjson_lines(lines)
+
+                    staged = []
+                    for record in records:
+                        name = str(record.get("item") or "").strip()
+                        if not name:
+                            skipped += 1
+                            continue
+
+                        item_id = item_ids.get(name)
+                        if item_id is None:
+                            unknown_items[name] += 1
+                            continue
+
+                        row = to_staging_row(record, item_id)
+                        if row is None:
+                            skipped += 1
+                        else:
+                            staged.append(row)
+
+                    if staged:
+                        conn.exec_driver_sql(
+                            "INSERT INTO sale_logs_staging "
+                            "(item_id, date, quantity, sold_at, weekday, hour) "
+                            "VALUES (?, ?, ?, ?, ?, ?)",
+                            staged,
+                        )
+                        merge_staging(conn)
+
+                    loaded += len(staged)
+                    rows_done += len(lines) + bad_lines
+                    save_checkpoint(conn, path, size, offset, rows_done)
+                    conn.commit()
+
+                    elapsed = time.perf_counter() - started
+                    rate = loaded / elapsed if elapsed else 0
+                    click.echo(
+                        f"{rows_done:,} rows read, {loaded:,} loaded, "
+                        f"{skipped:,} malformed, "
+                        f"{sum(unknown_items.values()):,} unknown item "
+                        f"({rate:,.0f} rows/sec)"
+                    )
+
+            # Keep the checkpoint as a "completed" marker (offset == size) so
+            # re-running the same file is refused rather than duplicated.
+            save_checkpoint(conn, path, size, size, rows_done)
+            conn.commit()
+        finally:
+            # Roll back first (also on Ctrl-C): SQLite refuses to change
+            # synchronous inside an open transaction. No-op after a commit.
+            conn.rollback()
+            for name, value in previous.items():
+                conn.exec_driver_sql(f"PRAGMA {name} = {value}")
+
+    click.echo(f"Done: {loaded:,} sales imported, {skipped:,} malformed rows skipped.")
+
+    if unknown_items:
+        click.echo(
+            f"{sum(unknown_items.values()):,} rows were NOT imported because "
+            "their item is not on the menu:"
+        )
+        for name, count in unknown_items.most_common():
+            click.echo(f"  {name}: {count:,} rows")
+
+
+@sales_cli.command("reconcile-counters")
+def reconcile_counters_command():
+    """Rebuild the dashboard counters from the sales tables."""
+    db = SessionLocal()
+    try:
+        before = {c.name: c.value for c in db.query(StatCounter)}
+        actual = reconcile_counters(db)
+        db.commit()
+    finally:
+        db.close()
+
+    for name, value in actual.items():
+        old = before.get(name)
+        status = "ok" if old is not None and abs(old - value) < 1e-6 else f"was {old}"
+        click.echo(f"{name}: {value} ({status})")
@@ -1,4 +1,13 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    Float,
+    Date,
+    Time,
+    ForeignKey,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import relationship
 
 from database import Base
@@ -15,6 +24,12 @@ class MenuItem(Base):
         back_populates="item",
         cascade="all, delete-orphan"
     )
+
+    hour_buckets = relationship(
+        "SaleHourBucket",
+        back_populates="item",
+        cascade="all, delete-orphan"
+    )
 class SaleLog(Base):
     __tablename__ = "sale_logs"
 
@@ -23,5 +38,33 @@ class SaleLog(Base):
     date = Column(Date, nullable=False)
     quantity = Column(Integer, nullable=False)
 
+    # Optional time of sale (only timed sales feed the hourly buckets)
+    sold_at = Column(Time, nullable=True)
+
     # Link back to the menu items
-    item = relationship("MenuItem", back_populates="sale_logs")
\ No newline at end of file
+    item = relationship("MenuItem", back_populates="sale_logs")
+
+
+class SaleHourBucket(Base):
+    """Pre-aggregated quantity per item x day x hour, kept up to date on write."""
+    __tablename__ = "sale_hour_buckets"
+    __table_args__ = (
+        UniqueConstraint("item_id", "date", "hour", name="uq_bucket_item_date_hour"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    item_id = Column(Integer, ForeignKey("menu_items.id"), nullable=False)
+    date = Column(Date, nullable=False, index=True)
+    weekday = Column(Integer, nullable=False)  # Mon=0 ... Sun=6
+    hour = Column(Integer, nullable=False)     # 0-23
+    quantity = Column(Integer, nullable=False, default=0)
+
+    item = relationship("MenuItem", back_populates="hour_buckets")
+
+
+class StatCounter(Base):
+    """Running totals (item count, sale count, lifetime qty/revenue) by name."""
+    __tablename__ = "stat_counters"
+
+    name = Column(String, primary_key=True)
+    value = Column(Float, nullable=False, default=0)
@@ -1,7 +1,8 @@
 from datetime import date, timedelta
-from sqlalchemy import func
+from sqlalchemy import and_, case, func, or_, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
-from models import MenuItem, SaleLog
+from models import MenuItem, SaleLog, SaleHourBucket, StatCounter
 
 
 # ---------------------------------------------------------
@@ -12,6 +13,14 @@ def get_week_start(d):
     return d - timedelta(days=d.weekday())
 
 
+def get_month_range(year, month):
+    """Return (first day, first day of next month) for a month."""
+    start = date(year, month, 1)
+    if month == 12:
+        return start, date(year + 1, 1, 1)
+    return start, date(year, month + 1, 1)
+
+
 # ---------------------------------------------------------
 # A) DAILY / WEEKLY / MONTHLY — USER SCOPED
 # ---------------------------------------------------------
@@ -204,3 +213,273 @@ def get_item_month_breakdown(db, item_id):
         earn_list.append(float(r.earn))
 
     return {"labels": labels, "qty": qty_list, "earn": earn_list}
+
+
+
+# ---------------------------------------------------------
+# C) HOURLY BUCKETS (item x day x hour)
+# ---------------------------------------------------------
+
+WEEKDAY_LABELS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+def add_to_hour_bucket(db, item_id, sale_date, sold_at, quantity):
+    """Add a timed sale to its hourly bucket. Untimed sales are skipped.
+
+    Uses the same atomic upsert as importer.merge_staging, so concurrent
+    sales for one item/day/hour can't race on the unique constraint.
+    """
+    if sold_at is None:
+        return
+
+    stmt = sqlite_insert(SaleHourBucket).values(
+        item_id=item_id,
+        date=sale_date,
+        weekday=sale_date.weekday(),
+        hour=sold_at.hour,
+        quantity=quantity
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["item_id", "date", "hour"],
+        set_={"quantity": SaleHourBucket.quantity + stmt.excluded.quantity}
+    )
+    db.execute(stmt)
+
+
+
+def get_hourly_heatmap(db, start_date, end_date):
+    """Return an item x weekday x hour quantity matrix for [start_date, end_date].
+
+    Read from the hourly buckets, so the scan is bounded by
+    items x days x 24 no matter how many sales were logged.
+    """
+    rows = (
+        db.query(
+            MenuItem.name,
+            SaleHourBucket.weekday,
+            SaleHourBucket.hour,
+            func.sum(SaleHourBucket.quantity).label("qty")
+        )
+        .join(SaleHourBucket, SaleHourBucket.item_id == MenuItem.id)
+        .filter(SaleHourBucket.date >= start_date)
+        .filter(SaleHourBucket.date <= end_date)
+        .group_by(MenuItem.name, SaleHourBucket.weekday, SaleHourBucket.hour)
+        .all()
+    )
+
+    matrix = {}
+    for r in rows:
+        grid = matrix.setdefault(r.name, [[0] * 24 for _ in range(7)])
+        grid[r.weekday][r.hour] = r.qty
+
+    return {
+        "items": sorted(matrix),
+        "weekdays": WEEKDAY_LABELS,
+        "hours": list(range(24)),
+        "matrix": matrix
+    }
+
+
+
+# ---------------------------------------------------------
+# D) PERIOD-OVER-PERIOD COMPARISON
+# ---------------------------------------------------------
+
+COMPARISON_MODES = {
+    "week": "Week to date vs same days last week",
+    "month": "Month to date vs same days last month",
+    "year": "Month to date vs same days last year",
+}
+
+
+def _month_to_date(year, month, days):
+    """Return the first `days` days of a month, capped at its last day."""
+    start, month_end = get_month_range(year, month)
+    return start, min(start + timedelta(days=days), month_end)
+
+
+def get_comparison_periods(today, mode):
+    """Return ((cur_start, cur_end), (prior_start, prior_end)), ends exclusive.
+
+    Both periods stop at the same elapsed point (through `today`), so a
+    period in progress is compared like with like.
+    """
+    if mode == "week":
+        start = get_week_start(today)
+        end = today + timedelta(days=1)
+        return (
+            (start, end),
+            (start - timedelta(days=7), end - timedelta(days=7))
+        )
+
+    current = _month_to_date(today.year, today.month, today.day)
+
+    if mode == "month":
+        prior_start = (current[0] - timedelta(days=1)).replace(day=1)
+        return current, _month_to_date(prior_start.year, prior_start.month, today.day)
+
+    if mode == "year":
+        return current, _month_to_date(today.year - 1, today.month, today.day)
+
+    raise ValueError(f"Unknown comparison mode: {mode}")
+
+
+def _delta(current, prior):
+    pct = round((current - prior) / prior * 100, 1) if prior else None
+    return current - prior, pct
+
+
+def _period_info(period):
+    start, end = period
+    return {
+        "start": start.isoformat(),
+        "end": (end - timedelta(days=1)).isoformat(),
+        "days": (end - start).days
+    }
+
+
+def get_period_comparison(db, current, prior):
+    """Compare two [start, end) periods for every item in ONE scan.
+
+    Both periods are summed side by side with conditional aggregation, so
+    this costs about the same as a single get_weekly/monthly_sales call.
+    """
+    in_current = and_(SaleLog.date >= current[0], SaleLog.date < current[1])
+    in_prior = and_(SaleLog.date >= prior[0], SaleLog.date < prior[1])
+
+    rows = (
+        db.query(
+            MenuItem.name,
+            MenuItem.price,
+            func.sum(case((in_current, SaleLog.quantity), else_=0)).label("cur_qty"),
+            func.sum(case((in_prior, SaleLog.quantity), else_=0)).label("prior_qty")
+        )
+        .join(SaleLog, SaleLog.item_id == MenuItem.id)
+        .filter(or_(in_current, in_prior))
+        .group_by(MenuItem.name, MenuItem.price)
+        .order_by(MenuItem.name)
+        .all()
+    )
+
+    items = []
+    totals = {"current_qty": 0, "prior_qty": 0, "current_earn": 0.0, "prior_earn": 0.0}
+
+    for r in rows:
+        cur_earn = r.cur_qty * r.price
+        prior_earn = r.prior_qty * r.price
+        qty_delta, qty_pct = _delta(r.cur_qty, r.prior_qty)
+        earn_delta, earn_pct = _delta(cur_earn, prior_earn)
+
+        items.append({
+            "name": r.name,
+            "current_qty": r.cur_qty, "prior_qty": r.prior_qty,
+            "qty_delta": qty_delta, "qty_pct": qty_pct,
+            "current_earn": cur_earn, "prior_earn": prior_earn,
+            "earn_delta": earn_delta, "earn_pct": earn_pct,
+        })
+
+        totals["current_qty"] += r.cur_qty
+        totals["prior_qty"] += r.prior_qty
+        totals["current_earn"] += cur_earn
+        totals["prior_earn"] += prior_earn
+
+    totals["qty_delta"], totals["qty_pct"] = _delta(totals["current_qty"], totals["prior_qty"])
+    totals["earn_delta"], totals["earn_pct"] = _delta(totals["current_earn"], totals["prior_earn"])
+
+    return {
+        "current": _period_info(current),
+        "prior": _period_info(prior),
+        "items": items,
+        "total": totals
+    }
+
+
+
+# ---------------------------------------------------------
+# E) RUNNING COUNTERS (dashboard headline figures)
+# ---------------------------------------------------------
+
+COUNTER_NAMES = ["total_items", "total_sale_logs", "lifetime_qty", "lifetime_revenue"]
+
+
+def bump_counters(db, **deltas):
+    """Apply deltas to the running counters inside the caller's transaction.
+
+    A delta may be a number or a SQL expression (see item_sales_totals),
+    which is then evaluated atomically inside the UPDATE itself.
+    """
+    for name, delta in deltas.items():
+        if isinstance(delta, (int, float)) and not delta:
+            continue
+        (
+            db.query(StatCounter)
+            .filter(StatCounter.name == name)
+            .update({StatCounter.value: StatCounter.value + delta},
+                    synchronize_session=False)
+        )
+
+
+
+def item_sales_totals(item_id):
+    """Return (sale count, total qty) for one item as scalar subqueries."""
+    count = (
+        select(func.count(SaleLog.id))
+        .where(SaleLog.item_id == item_id)
+        .scalar_subquery()
+    )
+    qty = (
+        select(func.coalesce(func.sum(SaleLog.quantity), 0))
+        .where(SaleLog.item_id == item_id)
+        .scalar_subquery()
+    )
+    return count, qty
+
+
+
+def get_counters(db):
+    """Return the running counters via primary-key lookups (no table scans)."""
+    values = {name: 0 for name in COUNTER_NAMES}
+    for c in db.query(StatCounter).filter(StatCounter.name.in_(COUNTER_NAMES)):
+        values[c.name] = c.value
+
+    return {
+        name: (float(value) if name == "lifetime_revenue" else int(value))
+        for name, value in values.items()
+    }
+
+
+
+def reconcile_counters(db):
+    """Recompute every counter from the base tables and overwrite it."""
+    sales = (
+        db.query(
+            func.count(SaleLog.id),
+            func.sum(SaleLog.quantity),
+            func.sum(SaleLog.quantity * MenuItem.price)
+        )
+        .join(MenuItem, SaleLog.item_id == MenuItem.id)
+        .first()
+    )
+
+    actual = {
+        "total_items": db.query(func.count(MenuItem.id)).scalar() or 0,
+        "total_sale_logs": sales[0] or 0,
+        "lifetime_qty": sales[1] or 0,
+        "lifetime_revenue": float(sales[2] or 0),
+    }
+
+    for name, value in actual.items():
+        db.merge(StatCounter(name=name, value=value))
+
+    return actual
+
+
+
+def ensure_counters(db):
+    """Seed the counters from the base tables if they have never been built."""
+    have = db.query(func.count(StatCounter.name)).filter(
+        StatCounter.name.in_(COUNTER_NAMES)
+    ).scalar()
+
+    if have < len(COUNTER_NAMES):
+        reconcile_counters(db)